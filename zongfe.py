@@ -1,14 +1,120 @@
 import os
+import re
+import math
 import glob
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+import importlib.util
+from contextlib import closing, nullcontext
+from functools import lru_cache, partial
+import zipfile
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+from concurrent.futures import ProcessPoolExecutor
+
+# 安装了Numba时，分数矩阵使用NumPy数组并由编译后的函数计算总分；
+# 否则（如PyPy或无法安装Numba的环境）使用嵌套列表和纯Python实现。
+# 这里只检查numba是否存在，numba和numpy导入较慢，到真正计算分数时才由use_numba()导入
+HAS_NUMBA = importlib.util.find_spec('numba') is not None
 
 SUMMARY_FILE = '活动总分汇总表.xlsx'
 
+# xlsx文件中XML使用的命名空间
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+# 活动数据文件名中的期数，只匹配路径最后一段，如 'Samples/S1.xlsx' 中的 1
+_PERIOD_RE = re.compile(r'(?:^|[\\/])S(\d+)\.xlsx$')
+
+# XML 1.0 中不允许出现的控制字符，写出前需要去掉
+_ILLEGAL_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# 输出总表的xlsx包结构，只有一个名为“总分汇总”的工作表
+_CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<Relationships xmlns="{_PKG_REL_NS[1:-1]}">'
+    '<Relationship Id="rId1" Target="xl/workbook.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+    '</Relationships>'
+)
+_WORKBOOK_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<workbook xmlns="{_MAIN_NS[1:-1]}" xmlns:r="{_REL_NS[1:-1]}">'
+    '<bookViews><workbookView activeTab="0"/></bookViews>'
+    '<sheets><sheet name="总分汇总" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<Relationships xmlns="{_PKG_REL_NS[1:-1]}">'
+    '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+    '<Relationship Id="rId2" Target="styles.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/>'
+    '</Relationships>'
+)
+
+# 输出总表使用的填充色和边框
+_HEADER_FILL = 'B0C4DE'
+_PERIOD_FILL = 'D5E8D4'
+_ZERO_FILL = 'FFCCCC'  # 0分（未参加）
+_TOTAL_FILL = 'FFD700'
+_BORDER = (
+    '<border><left style="thin"><color rgb="00000000"/></left>'
+    '<right style="thin"><color rgb="00000000"/></right>'
+    '<top style="thin"><color rgb="00000000"/></top>'
+    '<bottom style="thin"><color rgb="00000000"/></bottom><diagonal/></border>'
+)
+
+# 单元格格式序号，对应_STYLES_XML中cellXfs的顺序
+_HEADER_XF, _PERIOD_XF, _PERIOD_ZERO_XF, _TOTAL_XF, _DATA_XF = 1, 2, 3, 4, 5
+
+# 样式表在导入时生成一次，每次写出总表时直接复用
+_STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<styleSheet xmlns="{_MAIN_NS[1:-1]}">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="6"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    + ''.join(
+        f'<fill><patternFill patternType="solid"><fgColor rgb="00{color}"/>'
+        f'<bgColor rgb="00{color}"/></patternFill></fill>'
+        for color in (_HEADER_FILL, _PERIOD_FILL, _ZERO_FILL, _TOTAL_FILL)
+    ) +
+    '</fills>'
+    f'<borders count="2"><border><left/><right/><top/><bottom/><diagonal/></border>{_BORDER}</borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="6"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    # 表头、期数列、0分期数列、总分：居中并带边框，表头和总分加粗
+    + ''.join(
+        f'<xf numFmtId="0" fontId="{font_id}" fillId="{fill_id}" borderId="1" xfId="0" '
+        'applyFont="1" applyFill="1" applyBorder="1" applyAlignment="1">'
+        '<alignment horizontal="center" vertical="center"/></xf>'
+        for font_id, fill_id in ((1, 2), (0, 3), (0, 4), (1, 5))
+    ) +
+    # 其他数据单元格只带边框
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="1" xfId="0" applyBorder="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
 def process_activity_data(file_pattern='S*.xlsx', update_mode=True):
     """
-    处理所有活动数据文件并生成或更新总表，仅使用openpyxl库
+    处理所有活动数据文件并生成或更新总表
     
     参数:
     file_pattern (str): 文件匹配模式，默认为'S*.xlsx'
@@ -23,320 +129,692 @@ def process_activity_data(file_pattern='S*.xlsx', update_mode=True):
     
     print(f"找到以下文件: {files}")
     
+    # 从文件名中提取期次，每个文件只提取一次
+    file_periods = []
+    for file in files:
+        period_key = get_period_key(file)
+        if period_key is None:
+            print(f"警告: 文件名 {file} 不符合'S数字.xlsx'格式，已跳过")
+            continue
+        file_periods.append((file, period_key))
+    
+    # 参与者数据按列分开存储：学号、姓名、手机各为一个列表，第i名参与者对应各列表的第i项
+    student_ids, names, phones = [], [], []
+    existing_scores = []
+    
     # 检查是否存在现有的总表，以及是否需要更新
-    existing_data = {}
+    # 期次列表保留总表中的列顺序，判断期次是否已存在时使用集合
     existing_periods = []
+    existing_period_set = set()
     if update_mode and os.path.exists(SUMMARY_FILE):
         print(f"检测到现有总表文件: {SUMMARY_FILE}，将在此基础上更新")
-        existing_data, existing_periods = read_existing_summary()
-    
-    # 用于存储所有数据的字典
-    all_data = existing_data.copy()  # 复制现有数据（如果有）
-    
-    # 用于存储所有参与者ID的集合
-    all_participants = set()
-    if existing_data:
-        all_participants = set(existing_data.keys())
-    
-    # 用于存储参与者信息的字典 (学号 -> [姓名, 手机])
-    participant_info = {}
-    for student_id, data in existing_data.items():
-        participant_info[student_id] = data['info']
-    
-    # 处理需要添加的新文件
-    processed_files = []
-    for file in files:
-        # 从文件名中提取期数
-        period = file.replace('S', '').replace('.xlsx', '')
-        period_key = f'S{period}'
-        
+        # 先只读取表头获取已有期次，确实存在新期次时才读取完整的总表数据
+        existing_periods = read_summary_periods()
+        existing_period_set = set(existing_periods)
+        has_new_period = any(period_key not in existing_period_set for _, period_key in file_periods)
+        if has_new_period:
+            student_ids, names, phones, existing_scores, existing_periods = read_existing_summary()
+            # 以完整读取的结果为准，读取失败时不跳过任何文件，避免丢失数据
+            existing_period_set = set(existing_periods)
+    
+    # 学号 -> 行号，用于查找参与者所在的行
+    student_idx = {student_id: i for i, student_id in enumerate(student_ids)}
+    
+    # 筛选需要添加的新文件
+    new_files = []
+    for file, period_key in file_periods:
         # 如果当前期数已经在总表中，则跳过（除非强制更新）
-        if period_key in existing_periods and update_mode:
+        if period_key in existing_period_set and update_mode:
             print(f"期次 {period_key} 已存在于总表中，跳过文件 {file}")
             continue
         
-        try:
-            # 读取Excel文件
-            wb = load_workbook(filename=file, read_only=True)
-            ws = wb.active
-            
-            # 获取表头
-            headers = []
-            for cell in next(ws.rows):
-                headers.append(cell.value)
-            
-            # 检查必要的列是否存在
-            required_columns = ['年级专业班级姓名', '手机号码', '学号', '总分']
-            missing_columns = [col for col in required_columns if col not in headers]
-            
-            if missing_columns:
-                print(f"警告: 文件 {file} 缺少以下必要列: {missing_columns}")
-                continue
-            
-            # 获取必要列的索引
-            name_idx = headers.index('年级专业班级姓名')
-            phone_idx = headers.index('手机号码')
-            id_idx = headers.index('学号')
-            score_idx = headers.index('总分')
+        new_files.append((file, period_key))
+    
+    processed_periods = []
+    if new_files:
+        # 分数矩阵（行: 参与者，列: 期次），行数不足时按倍数扩容；
+        # 每个期次占一列，列数上限为现有期次数加输入文件数。
+        # 没有新文件时不创建，避免无事可做时也导入numpy
+        scores = new_score_matrix(max(len(student_ids), 64), len(existing_periods) + len(file_periods))
+        for i, row_scores in enumerate(existing_scores):
+            scores[i][:len(row_scores)] = row_scores
+        period_col = {period: j for j, period in enumerate(existing_periods)}
+        
+        # 各文件相互独立，在多个进程中并行读取，再按文件顺序依次合并；
+        # 只有一个文件时直接在当前进程读取，省去启动进程池的开销
+        executor = None
+        if len(new_files) > 1:
+            executor = ProcessPoolExecutor(max_workers=min(len(new_files), os.cpu_count() or 1))
+        
+        with executor or nullcontext():
+            pending = [
+                (file, period_key,
+                 executor.submit(parse_file, file).result if executor else partial(parse_file, file))
+                for file, period_key in new_files
+            ]
             
-            # 跳过表头，读取数据行
-            row_count = 0
-            for row in list(ws.rows)[1:]:
-                row_count += 1
-                # 确保行有足够的单元格
-                if len(row) <= max(name_idx, phone_idx, id_idx, score_idx):
-                    print(f"警告: 第 {row_count+1} 行数据不完整，已跳过")
-                    continue
-                
-                # 读取单元格数据
-                name = row[name_idx].value
-                phone = row[phone_idx].value
-                student_id = str(row[id_idx].value)  # 转为字符串确保一致性
-                score = row[score_idx].value if row[score_idx].value is not None else 0
-                
-                # 跳过没有学号的记录
-                if not student_id:
-                    print(f"警告: 文件 {file} 中第 {row_count+1} 行缺少学号，已跳过")
-                    continue
-                
-                # 更新参与者ID集合
-                all_participants.add(student_id)
+            for file, period_key, get_result in pending:
+                try:
+                    records, warnings = get_result()
+                    for message in warnings:
+                        print(message)
+                    
+                    if records is None:
+                        continue
+                    
+                    # 当前期次在分数矩阵中的列号
+                    col = period_col.setdefault(period_key, len(period_col))
+                    scores = ingest_records(records, col, student_idx, student_ids, names, phones, scores)
+                    
+                    processed_periods.append(period_key)
+                    print(f"成功处理文件 {file}，当前总表包含 {len(student_ids)} 名参与者")
                 
-                # 存储学生信息
-                if student_id not in participant_info:
-                    participant_info[student_id] = [name, phone]
-                
-                # 如果学生不在all_data中，添加一个空字典
-                if student_id not in all_data:
-                    all_data[student_id] = {'info': [name, phone], 'scores': {}}
-                
-                # 存储分数
-                all_data[student_id]['scores'][period_key] = score
-            
-            processed_files.append(file)
-            print(f"成功处理文件 {file}，当前总表包含 {len(all_participants)} 名参与者")
-            wb.close()
-        
-        except Exception as e:
-            print(f"读取文件 {file} 时出错: {e}")
+                except Exception as e:
+                    print(f"读取文件 {file} 时出错: {e}")
     
-    if not processed_files and not existing_data:
+    if not processed_periods and not existing_periods:
         print("没有成功读取任何文件数据")
         return
-    elif not processed_files and existing_data:
+    elif not processed_periods and existing_periods:
         print("没有新的文件需要处理，总表保持不变")
         return
     
     # 获取所有期次（包括现有的和新添加的）
-    all_periods = sorted(set(existing_periods + [
-        f'S{file.replace("S", "").replace(".xlsx", "")}' 
-        for file in processed_files
-    ]))
-    
-    # 创建新的工作簿用于输出
-    result_wb = Workbook()
-    result_ws = result_wb.active
-    result_ws.title = "总分汇总"
+    all_periods = sorted(set(existing_periods).union(processed_periods))
     
     # 添加表头
     headers = ['年级专业班级姓名', '手机号码', '学号']
     headers.extend(all_periods)
     headers.append('总分')
     
-    # 写入表头
-    for col_idx, header in enumerate(headers, 1):
-        result_ws.cell(row=1, column=col_idx, value=header)
-    
-    # 为每个参与者添加数据行
-    result_data = []  # 用于排序的临时数据存储
-    
-    for student_id in all_participants:
-        student_data = all_data.get(student_id, {})
-        student_info = participant_info.get(student_id, ['未知', '未知'])
-        student_scores = student_data.get('scores', {}) if isinstance(student_data, dict) else {}
-        
-        # 计算总分并创建行数据
-        row_data = [student_info[0], student_info[1], student_id]
-        total_score = 0
-        
-        for period in all_periods:
-            score = student_scores.get(period, 0)
-            total_score += score
-            row_data.append(score)
-        
-        row_data.append(total_score)
-        result_data.append(row_data)
-    
-    # 按总分降序排序
-    result_data.sort(key=lambda x: x[-1], reverse=True)
+    # 按期次顺序取出有效的分数列（读取失败的文件对应的列被丢弃），计算总分并按总分降序排序
+    score_rows, totals, order = rank_scores(
+        scores, len(student_ids), [period_col[period] for period in all_periods]
+    )
     
-    # 写入排序后的数据
-    for row_idx, row_data in enumerate(result_data, 2):
-        for col_idx, value in enumerate(row_data, 1):
-            result_ws.cell(row=row_idx, column=col_idx, value=value)
+    # 按排序结果逐行生成数据行，写出时边生成边写入，不保留完整的行列表
+    result_rows = (
+        [names[i], phones[i], student_ids[i]] + score_rows[i] + [totals[i]]
+        for i in order
+    )
     
-    # 美化输出文件
-    beautify_excel(result_ws, all_periods)
+    # 期数列和总分列的列号只计算一次，逐行写入时按列号判断样式
+    period_col_set = {col_idx for col_idx, header in enumerate(headers, 1) if header in all_periods}
+    total_col = headers.index('总分') + 1
     
     # 保存结果
-    result_wb.save(SUMMARY_FILE)
+    write_summary_xlsx(SUMMARY_FILE, headers, result_rows, period_col_set, total_col)
     
     print(f"总表已生成/更新: {SUMMARY_FILE}")
-    print(f"- 包含 {len(all_participants)} 名参与者")
+    print(f"- 包含 {len(student_ids)} 名参与者")
     print(f"- 包含 {len(all_periods)} 期活动数据")
     
     return SUMMARY_FILE
 
 
-def read_existing_summary():
+def get_period_key(file):
     """
-    读取现有的总表数据
+    从文件名中提取期次，例如 'data/S12.xlsx' -> 'S12'
+    
+    参数:
+    file (str): 文件路径
     
     返回:
-    tuple: (数据字典, 期次列表)
+    str: 期次；文件名不符合'S数字.xlsx'格式时返回None
     """
-    try:
-        wb = load_workbook(filename=SUMMARY_FILE, read_only=True)
-        ws = wb.active
+    m = _PERIOD_RE.search(file)
+    return f'S{m.group(1)}' if m else None
+
+
+def parse_file(file):
+    """
+    读取单个活动数据文件，可在子进程中运行
+    
+    参数:
+    file (str): 文件路径
+    
+    返回:
+    tuple: (记录列表, 警告信息列表)，每条记录为 (学号, 姓名, 手机, 分数)；
+           文件缺少必要列时记录列表为None
+    """
+    records = []
+    warnings = []
+    
+    # 直接解析工作表XML逐行读取，不经过openpyxl
+    with closing(iter_xlsx_rows(file)) as row_iter:
+        _, header_row = next(row_iter)
+        headers = list(header_row)
         
-        # 获取表头
-        headers = []
-        for cell in next(ws.rows):
-            headers.append(cell.value)
+        # 检查必要的列是否存在
+        required_columns = ['年级专业班级姓名', '手机号码', '学号', '总分']
+        missing_columns = [col for col in required_columns if col not in headers]
         
-        # 查找必要列的索引
-        try:
-            name_idx = headers.index('年级专业班级姓名')
-            phone_idx = headers.index('手机号码')
-            id_idx = headers.index('学号')
-            total_idx = headers.index('总分')
-        except ValueError as e:
-            print(f"现有总表缺少必要的列: {e}")
-            return {}, []
+        if missing_columns:
+            warnings.append(f"警告: 文件 {file} 缺少以下必要列: {missing_columns}")
+            return None, warnings
         
-        # 提取期次列
-        period_columns = []
-        for i, header in enumerate(headers):
-            if header.startswith('S') and i not in [name_idx, phone_idx, id_idx, total_idx]:
-                period_columns.append(header)
+        # 获取必要列的索引
+        name_idx = headers.index('年级专业班级姓名')
+        phone_idx = headers.index('手机号码')
+        id_idx = headers.index('学号')
+        score_idx = headers.index('总分')
         
-        # 读取所有学生数据
-        student_data = {}
+        # 一行至少需要包含的单元格数
+        min_row_len = max(name_idx, phone_idx, id_idx, score_idx) + 1
         
-        for row in list(ws.rows)[1:]:  # 跳过表头
+        # 跳过表头，读取数据行
+        for row_number, row in row_iter:
             # 确保行有足够的单元格
-            if len(row) <= max(name_idx, phone_idx, id_idx, total_idx):
+            if len(row) < min_row_len:
+                warnings.append(f"警告: 第 {row_number} 行数据不完整，已跳过")
                 continue
             
-            name = row[name_idx].value
-            phone = row[phone_idx].value
-            student_id = str(row[id_idx].value)
+            # 读取单元格数据
+            name = row[name_idx]
+            phone = row[phone_idx]
+            student_id = str(row[id_idx])  # 转为字符串确保一致性
+            score = to_score(row[score_idx])  # 读取时统一转换为float
             
+            # 跳过没有学号的记录
             if not student_id:
+                warnings.append(f"警告: 文件 {file} 中第 {row_number} 行缺少学号，已跳过")
                 continue
             
-            # 创建学生记录
-            student_data[student_id] = {
-                'info': [name, phone],
-                'scores': {}
-            }
+            if score is None:
+                warnings.append(f"警告: 文件 {file} 中第 {row_number} 行总分 '{row[score_idx]}' 不是数字，按0分计算")
+                score = 0.0
             
-            # 读取各期分数
-            for period in period_columns:
-                period_idx = headers.index(period)
-                if period_idx < len(row):
-                    score = row[period_idx].value
-                    student_data[student_id]['scores'][period] = score if score is not None else 0
+            records.append((student_id, name, phone, score))
+    
+    return records, warnings
+
+
+def to_score(value):
+    """
+    将单元格中的分数转换为float，空单元格记为0分
+    
+    参数:
+    value: 单元格的值
+    
+    返回:
+    float: 分数；无法识别为数字或不是有限值（如'nan'、'inf'）时返回None
+    """
+    if value is None:
+        return 0.0
+    try:
+        if isinstance(value, (int, float)):
+            score = float(value)
+        else:
+            score = float(str(value).strip() or 0)
+    except (ValueError, OverflowError):
+        return None
+    # nan、inf无法写入xlsx，按无法识别处理
+    return score if math.isfinite(score) else None
+
+
+def iter_xlsx_rows(file):
+    """
+    直接解析xlsx文件中活动工作表的XML，逐行返回行号和单元格值组成的元组
+    
+    只处理读取活动数据所需的单元格类型（数字、共享字符串、内联字符串、布尔值），
+    数字按openpyxl的规则转换为int或float，不识别日期格式，ISO日期单元格返回原文本。
+    
+    参数:
+    file (str): 文件路径
+    
+    返回:
+    generator: 每行一个 (行号, 值元组)，行号取自XML中的行号（从1开始），
+               值元组补齐到已出现的最大列数，空单元格为None
+    """
+    with zipfile.ZipFile(file) as z:
+        shared_strings = _read_shared_strings(z)
+        width = 0
+        row_number = 0
         
-        wb.close()
-        return student_data, period_columns
+        with z.open(_active_sheet_path(z)) as f:
+            for _, el in ElementTree.iterparse(f):
+                if el.tag != f'{_MAIN_NS}row':
+                    continue
+                
+                # 稀疏的工作表中会省略空行，行号以XML中的r属性为准
+                r = el.get('r')
+                row_number = int(r) if r else row_number + 1
+                
+                values = {}
+                next_col = 0
+                for c in el.iter(f'{_MAIN_NS}c'):
+                    ref = c.get('r')
+                    col = _column_index(ref) if ref else next_col
+                    next_col = col + 1
+                    values[col] = _cell_value(c, shared_strings)
+                
+                width = max(width, next_col, max(values, default=-1) + 1)
+                yield row_number, tuple(values.get(i) for i in range(width))
+                
+                # 释放已处理的行，保持内存占用恒定
+                el.clear()
+
+
+def _active_sheet_path(z):
+    """返回xlsx压缩包中活动工作表XML的路径"""
+    workbook = ElementTree.fromstring(z.read('xl/workbook.xml'))
+    view = workbook.find(f'{_MAIN_NS}bookViews/{_MAIN_NS}workbookView')
+    active_tab = int(view.get('activeTab', 0)) if view is not None else 0
+    sheets = workbook.findall(f'{_MAIN_NS}sheets/{_MAIN_NS}sheet')
+    rel_id = sheets[active_tab].get(f'{_REL_NS}id')
+    
+    for rel in _workbook_rels(z):
+        if rel.get('Id') == rel_id:
+            return _rel_target_path(rel)
+    
+    raise KeyError(f"找不到工作表关系 {rel_id}")
+
+
+def _workbook_rels(z):
+    """返回xl/workbook.xml的关系元素列表"""
+    rels = ElementTree.fromstring(z.read('xl/_rels/workbook.xml.rels'))
+    return list(rels.iter(f'{_PKG_REL_NS}Relationship'))
+
+
+def _rel_target_path(rel):
+    """返回关系指向的部件在压缩包中的路径"""
+    target = rel.get('Target')
+    # 关系中的路径可以是包内绝对路径，也可以是相对xl/目录的路径
+    return target.lstrip('/') if target.startswith('/') else f'xl/{target}'
+
+
+def _read_shared_strings(z):
+    """读取共享字符串表，文件中没有共享字符串时返回空列表"""
+    # 共享字符串表的位置以workbook.xml.rels中的声明为准，没有声明时使用默认路径
+    path = 'xl/sharedStrings.xml'
+    for rel in _workbook_rels(z):
+        if rel.get('Type', '').endswith('/sharedStrings'):
+            path = _rel_target_path(rel)
+            break
     
-    except Exception as e:
-        print(f"读取现有总表时出错: {e}")
-        return {}, []
+    try:
+        data = z.read(path)
+    except KeyError:
+        return []
+    
+    strings = []
+    for si in ElementTree.fromstring(data).iter(f'{_MAIN_NS}si'):
+        strings.append(_string_item_text(si))
+    return strings
+
+
+def _string_item_text(item):
+    """拼接字符串项中的文本，包括富文本片段，忽略注音"""
+    parts = []
+    for child in item:
+        if child.tag == f'{_MAIN_NS}t':
+            parts.append(child.text or '')
+        elif child.tag == f'{_MAIN_NS}r':
+            t = child.find(f'{_MAIN_NS}t')
+            if t is not None:
+                parts.append(t.text or '')
+    return ''.join(parts)
+
+
+def _cell_value(c, shared_strings):
+    """将单元格XML元素转换为Python值"""
+    cell_type = c.get('t', 'n')
+    
+    if cell_type == 'inlineStr':
+        item = c.find(f'{_MAIN_NS}is')
+        return _string_item_text(item) if item is not None else None
+    
+    v = c.find(f'{_MAIN_NS}v')
+    if v is None or v.text is None:
+        return None
+    text = v.text
+    
+    if cell_type == 's':
+        return shared_strings[int(text)]
+    if cell_type == 'b':
+        return text == '1'
+    if cell_type in ('str', 'e', 'd'):
+        return text
+    
+    # 数字：与openpyxl一致，含小数点或指数的按float处理，其余按int处理；
+    # 无法解析时返回原文本，避免某个不需要读取的列导致整个文件被丢弃
+    try:
+        if '.' in text or 'E' in text or 'e' in text:
+            return float(text)
+        return int(text)
+    except ValueError:
+        return text
+
+
+def _column_index(ref):
+    """将单元格引用（如'AB12'）转换为从0开始的列号"""
+    col = 0
+    for ch in ref:
+        if not ch.isalpha():
+            break
+        col = col * 26 + (ord(ch.upper()) - 64)
+    return col - 1
+
+
+def _column_letter(col):
+    """将从0开始的列号转换为列字母（如27 -> 'AB'）"""
+    letters = ''
+    col += 1
+    while col:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def new_score_matrix(n_rows, n_cols):
+    """
+    创建全0的分数矩阵，Numba可用时为NumPy数组，否则为嵌套列表
+    
+    两种形式都支持 scores[i][j] 形式的读写
+    """
+    if use_numba():
+        np, _ = _numba_backend()
+        return np.zeros((n_rows, n_cols), dtype=np.float64)
+    return [[0.0] * n_cols for _ in range(n_rows)]
+
+
+def grow_score_matrix(scores):
+    """返回行数扩大一倍的分数矩阵，原有数据保持不变"""
+    if use_numba():
+        np, _ = _numba_backend()
+        return np.vstack([scores, np.zeros_like(scores)])
+    n_cols = len(scores[0]) if scores else 0
+    return scores + [[0.0] * n_cols for _ in range(len(scores))]
 
 
-def beautify_excel(ws, period_columns):
+def ingest_records(records, col, student_idx, student_ids, names, phones, scores):
     """
-    美化Excel工作表的格式
+    将一个文件的记录合并到参与者列表和分数矩阵的指定列中
     
     参数:
-    ws (Worksheet): 需要美化的工作表
-    period_columns (list): 期数列的列表
+    records (list): parse_file() 返回的记录列表
+    col (int): 该期次在分数矩阵中的列号
+    student_idx (dict): 学号 -> 行号，会随新参与者更新
+    student_ids, names, phones (list): 参与者的学号、姓名、手机列表，会追加新参与者
+    scores: new_score_matrix() 创建的分数矩阵
+    
+    返回:
+    分数矩阵；行数不足时会扩容，返回的可能是新的对象
     """
-    # 定义样式
-    header_fill = PatternFill(start_color="B0C4DE", end_color="B0C4DE", fill_type="solid")
-    period_fill = PatternFill(start_color="D5E8D4", end_color="D5E8D4", fill_type="solid")
-    total_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
-    zero_fill = PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")
-    
-    header_font = Font(bold=True)
-    center_aligned = Alignment(horizontal="center", vertical="center")
-    border = Border(
-        left=Side(style="thin", color="000000"),
-        right=Side(style="thin", color="000000"),
-        top=Side(style="thin", color="000000"),
-        bottom=Side(style="thin", color="000000")
-    )
+    # 循环中反复调用的方法先取到局部变量，减少每行的属性查找
+    get_idx = student_idx.get
+    add_id, add_name, add_phone = student_ids.append, names.append, phones.append
+    # 行号 -> 分数；同一学号出现多次时后面的记录覆盖前面的
+    col_scores = {}
+    
+    for student_id, name, phone, score in records:
+        # 首次出现的学生追加到各列表末尾，并在分数矩阵中占用新的一行
+        idx = get_idx(student_id)
+        if idx is None:
+            idx = len(student_ids)
+            student_idx[student_id] = idx
+            add_id(student_id)
+            add_name(name)
+            add_phone(phone)
+        col_scores[idx] = score
+    
+    while len(scores) < len(student_ids):
+        scores = grow_score_matrix(scores)
+    
+    # 整列一次写入，行号已去重
+    if use_numba():
+        scores[list(col_scores), col] = list(col_scores.values())
+    else:
+        for idx, score in col_scores.items():
+            scores[idx][col] = score
+    return scores
+
+
+def rank_scores(scores, n_rows, cols):
+    """
+    取出分数矩阵的前n_rows行和指定的列，计算总分并按总分降序排序
     
-    # 获取表头
-    headers = [cell.value for cell in list(ws.rows)[0]]
+    参数:
+    scores: new_score_matrix() 创建的分数矩阵
+    n_rows (int): 有效的行数
+    cols (list): 需要保留的列号，按输出顺序排列
     
-    # 应用表头样式
-    for col_idx, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_idx)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = center_aligned
-        cell.border = border
+    返回:
+    tuple: (各行分数列表, 总分列表, 排序后的行索引列表)
+    """
+    if use_numba():
+        _, totals_and_order = _numba_backend()
+        score_mat = scores[:n_rows, cols]
+        totals, order = totals_and_order(score_mat)
+        return score_mat.tolist(), totals.tolist(), order.tolist()
+    
+    # 纯Python实现：sorted为稳定排序，总分相同时保持原有先后顺序
+    score_rows = [[row[j] for j in cols] for row in scores[:n_rows]]
+    totals = [sum(row) for row in score_rows]
+    order = sorted(range(n_rows), key=totals.__getitem__, reverse=True)
+    return score_rows, totals, order
+
+
+def totals_and_order(score_mat):
+    """
+    计算每名参与者的总分，并给出按总分降序排列的行顺序，由_numba_backend()编译后使用
     
-    # 设置列宽
-    ws.column_dimensions[get_column_letter(1)].width = 30  # 年级专业班级姓名
-    ws.column_dimensions[get_column_letter(2)].width = 15  # 手机号码
-    ws.column_dimensions[get_column_letter(3)].width = 15  # 学号
+    参数:
+    score_mat (ndarray): 分数矩阵，形状为 (参与者数, 期次数)
     
-    # 为各期分数和总分列设置样式
-    period_indices = []
+    返回:
+    tuple: (总分数组, 排序后的行索引数组)
+    """
+    totals = score_mat.sum(axis=1)
+    order = (-totals).argsort(kind='mergesort')  # 稳定排序，总分相同时保持原有先后顺序
+    return totals, order
+
+
+@lru_cache(maxsize=None)
+def use_numba():
+    """
+    判断是否使用Numba实现，首次调用时尝试导入，之后沿用同一结果
+    
+    numba已安装但无法导入（如与numpy版本不兼容）时退回纯Python实现
+    """
+    if not HAS_NUMBA:
+        return False
+    try:
+        _numba_backend()
+    except ImportError as e:
+        print(f"无法导入numba，将使用纯Python实现: {e}")
+        return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def _numba_backend():
+    """
+    首次使用时导入numpy和numba，并编译totals_and_order，之后直接复用
+    
+    返回:
+    tuple: (numpy模块, 编译后的totals_and_order)
+    """
+    import numpy
+    from numba import njit
+    return numpy, njit(cache=True)(totals_and_order)
+
+
+def read_summary_periods():
+    """
+    只读取现有总表的表头，获取其中已包含的期次
     
-    # 查找各期分数和总分列的索引
-    for col_idx, header in enumerate(headers, 1):
-        column_letter = get_column_letter(col_idx)
+    返回:
+    list: 期次列表
+    """
+    try:
+        # 只需要表头，直接解析XML读取首行，不必加载openpyxl
+        with closing(iter_xlsx_rows(SUMMARY_FILE)) as rows:
+            _, header_row = next(rows)
+            headers = list(header_row)
         
-        # 设置每列的基本样式
-        ws.column_dimensions[column_letter].width = 12
+        required_columns = ['年级专业班级姓名', '手机号码', '学号', '总分']
+        if any(col not in headers for col in required_columns):
+            return []
         
-        # 为期数列应用特殊样式
-        if header in period_columns:
-            for row_idx in range(2, ws.max_row + 1):
-                period_cell = ws.cell(row=row_idx, column=col_idx)
-                period_cell.fill = period_fill
-                period_cell.alignment = center_aligned
-                period_cell.border = border
+        return [
+            header for header in headers
+            if header.startswith('S') and header not in required_columns
+        ]
+    
+    except Exception as e:
+        print(f"读取现有总表表头时出错: {e}")
+        return []
+
+
+def read_existing_summary():
+    """
+    读取现有的总表数据
+    
+    返回:
+    tuple: (学号列表, 姓名列表, 手机列表, 分数列表, 期次列表)，
+           分数列表中每名参与者一个列表，其中的分数与期次列表一一对应
+    """
+    try:
+        # 与read_summary_periods()使用同一种方式读取，表头和数据要么都能读取，要么都失败；
+        # 使用closing确保出错或提前返回时也能关闭文件
+        with closing(iter_xlsx_rows(SUMMARY_FILE)) as row_iter:
+            # 获取表头
+            _, header_row = next(row_iter)
+            headers = list(header_row)
+            
+            # 查找必要列的索引
+            try:
+                name_idx = headers.index('年级专业班级姓名')
+                phone_idx = headers.index('手机号码')
+                id_idx = headers.index('学号')
+                total_idx = headers.index('总分')
+            except ValueError as e:
+                print(f"现有总表缺少必要的列: {e}")
+                return [], [], [], [], []
+            
+            # 提取期次列
+            period_columns = []
+            for i, header in enumerate(headers):
+                if header.startswith('S') and i not in [name_idx, phone_idx, id_idx, total_idx]:
+                    period_columns.append(header)
+            
+            # 一行至少需要包含的单元格数
+            min_row_len = max(name_idx, phone_idx, id_idx, total_idx) + 1
+            
+            # 期次列的索引只计算一次
+            period_idx_map = {period: headers.index(period) for period in period_columns}
+            
+            # 读取所有学生数据
+            student_idx = {}
+            student_ids, names, phones, score_rows = [], [], [], []
+            
+            for _, row in row_iter:  # 表头已读取，从数据行开始
+                # 确保行有足够的单元格
+                if len(row) < min_row_len:
+                    continue
                 
-                # 标记0分（未参加）的单元格
-                if period_cell.value == 0:
-                    period_cell.fill = zero_fill
+                name = row[name_idx]
+                phone = row[phone_idx]
+                student_id = str(row[id_idx])
+                
+                if not student_id:
+                    continue
+                
+                # 读取各期分数
+                row_scores = []
+                for period in period_columns:
+                    period_idx = period_idx_map[period]
+                    score = to_score(row[period_idx]) if period_idx < len(row) else 0.0
+                    row_scores.append(score if score is not None else 0.0)
+                
+                # 创建学生记录，学号重复时以后出现的记录为准
+                if student_id in student_idx:
+                    i = student_idx[student_id]
+                    names[i], phones[i], score_rows[i] = name, phone, row_scores
+                else:
+                    student_idx[student_id] = len(student_ids)
+                    student_ids.append(student_id)
+                    names.append(name)
+                    phones.append(phone)
+                    score_rows.append(row_scores)
             
-            period_indices.append(col_idx)
+        return student_ids, names, phones, score_rows, period_columns
+    
+    except Exception as e:
+        print(f"读取现有总表时出错: {e}")
+        return [], [], [], [], []
+
+
+def write_summary_xlsx(path, headers, rows, period_col_set, total_col):
+    """
+    直接生成xlsx文件的XML并打包，写出带样式的总表
+    
+    样式表使用模块级的_STYLES_XML，单元格按格式序号引用；首行冻结，各列等宽。
+    
+    参数:
+    path (str): 输出文件路径
+    headers (list): 表头列表
+    rows (iterable): 各数据行的值列表，按输出顺序排列
+    period_col_set (set): 期数列的列号集合（从1开始）
+    total_col (int): 总分列的列号（从1开始）
+    """
+    # 每列的单元格引用字母和数据行格式只计算一次
+    letters = [_column_letter(col_idx) for col_idx in range(len(headers))]
+    col_xfs = [
+        _PERIOD_XF if col_idx in period_col_set else _TOTAL_XF if col_idx == total_col else _DATA_XF
+        for col_idx in range(1, len(headers) + 1)
+    ]
+    
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('[Content_Types].xml', _CONTENT_TYPES_XML)
+        z.writestr('_rels/.rels', _ROOT_RELS_XML)
+        z.writestr('xl/workbook.xml', _WORKBOOK_XML)
+        z.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS_XML)
+        z.writestr('xl/styles.xml', _STYLES_XML)
         
-        # 为总分列应用特殊样式
-        elif header == "总分":
-            for row_idx in range(2, ws.max_row + 1):
-                total_cell = ws.cell(row=row_idx, column=col_idx)
-                total_cell.fill = total_fill
-                total_cell.alignment = center_aligned
-                total_cell.font = header_font
-                total_cell.border = border
-    
-    # 为所有其他单元格添加边框
-    for row in range(2, ws.max_row + 1):
-        for col in range(1, ws.max_column + 1):
-            if col not in period_indices and headers[col-1] != "总分":
-                cell = ws.cell(row=row, column=col)
-                cell.border = border
-    
-    # 冻结首行
-    ws.freeze_panes = "A2"
+        with z.open('xl/worksheets/sheet1.xml', 'w') as f:
+            f.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                f'<worksheet xmlns="{_MAIN_NS[1:-1]}">'
+                # 冻结首行
+                '<sheetViews><sheetView workbookViewId="0">'
+                '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+                '<selection pane="bottomLeft" activeCell="A2" sqref="A2"/>'
+                '</sheetView></sheetViews>'
+                '<sheetFormatPr defaultRowHeight="15"/>'
+                f'<cols><col min="1" max="{len(headers)}" width="12" customWidth="1"/></cols>'
+                '<sheetData>'
+            ).encode('utf-8'))
+            
+            f.write(_row_xml(1, headers, letters, [_HEADER_XF] * len(headers)).encode('utf-8'))
+            
+            for row_idx, row_data in enumerate(rows, 2):
+                # 标记0分（未参加）的单元格
+                xfs = [
+                    _PERIOD_ZERO_XF if xf == _PERIOD_XF and value == 0 else xf
+                    for xf, value in zip(col_xfs, row_data)
+                ]
+                f.write(_row_xml(row_idx, row_data, letters, xfs).encode('utf-8'))
+            
+            f.write(b'</sheetData></worksheet>')
+
+
+def _row_xml(row_idx, values, letters, xfs):
+    """生成一行单元格的XML"""
+    cells = []
+    for letter, value, xf in zip(letters, values, xfs):
+        ref = f'{letter}{row_idx}'
+        if value is None:
+            cells.append(f'<c r="{ref}" s="{xf}"/>')
+        elif isinstance(value, bool):
+            cells.append(f'<c r="{ref}" s="{xf}" t="b"><v>{int(value)}</v></c>')
+        elif isinstance(value, (int, float)):
+            cells.append(f'<c r="{ref}" s="{xf}"><v>{value!r}</v></c>')
+        else:
+            text = escape(_ILLEGAL_XML_CHARS.sub('', str(value)))
+            cells.append(f'<c r="{ref}" s="{xf}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{row_idx}">{"".join(cells)}</row>'
 
 
 def print_usage():